@@ -0,0 +1,431 @@
+"""Performance benchmarks for PyDF Pro.
+
+Each measurement runs in a fresh process so wall time and peak memory are not skewed by earlier runs.
+
+Usage:
+    python benchmark_pydfpro.py merge --files 500 --pages 3
+    python benchmark_pydfpro.py extract-images --pages 200
+    python benchmark_pydfpro.py object-streams --pages 2000
+    python benchmark_pydfpro.py linearize --pages 200 --mbps 10
+    python benchmark_pydfpro.py suite --sizes 10,100,1000 --save_baseline baseline.json
+    python benchmark_pydfpro.py suite --sizes 10,100,1000 --baseline baseline.json --threshold 0.25
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+from PyPDF2 import PdfReader
+
+import pydfpro
+
+def make_sample_pdf(path, num_pages, text_prefix="Page"):
+    doc = fitz.open()
+    for i in range(num_pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"{text_prefix} {i+1}", fontsize=14)
+        page.insert_textbox(fitz.Rect(72, 100, 540, 720), "Lorem ipsum dolor sit amet. " * 40, fontsize=10)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+def make_image_pdf(path, num_pages, image_size=(1600, 1200)):
+    """Creates a scan-like PDF with one distinct JPEG per page plus a small logo repeated on every page."""
+    doc = fitz.open()
+    logo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 120, 60), 0)
+    logo.clear_with(200)
+    logo_png = logo.tobytes("png")
+    for i in range(num_pages):
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, *image_size), 0)
+        pix.clear_with(i % 256)
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=pix.tobytes("jpeg"))
+        page.insert_image(fitz.Rect(20, 20, 140, 80), stream=logo_png)
+    doc.save(path)
+    doc.close()
+
+def run_handler(handler_name, options):
+    """Calls a pydfpro handler with an options dict standing in for its CLI arguments, discarding what it prints."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        getattr(pydfpro, handler_name)(argparse.Namespace(**options))
+
+def _peak_rss_mb():
+    """Peak RSS of this process in MB, or None where it is unavailable (reported as n/a).
+    Uses pydfpro's own snapshot so the units match --profile on every platform (ru_maxrss is bytes on macOS).
+    """
+    return pydfpro._resource_snapshot()[1]
+
+def run_cli(argv):
+    """Runs a pydfpro command line in-process. Returns (ok, captured_output); like batch mode, a run fails
+    if it raised or printed an error line, since handlers report problems by printing.
+    """
+    buffer = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buffer):
+            pydfpro.main(argv)
+    except Exception as e:
+        buffer.write(f"An error occurred: {e}\n")
+    output = buffer.getvalue()
+    return not any(line.startswith(("Error", "An error occurred")) for line in output.splitlines()), output
+
+def _timed_call(func, args):
+    start_time = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start_time, _peak_rss_mb(), result
+
+def run_isolated(func, *args):
+    """Runs func(*args) in a freshly spawned process and returns (elapsed_seconds, peak_rss_mb, result)."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_timed_call, (func, args))
+
+def _format_row(name, elapsed, peak_mb, extra=""):
+    peak = f"{peak_mb:9.1f} MB" if peak_mb is not None else "      n/a"
+    return f"  {name:28} {elapsed:9.3f}s {peak}  {extra}"
+
+def bench_merge(workdir, num_files, pages_per_file):
+    """Compares the streaming fitz merge engine with the PyPDF2 PdfMerger path."""
+    sample = os.path.join(workdir, "merge_src.pdf")
+    make_sample_pdf(sample, pages_per_file)
+    input_files = []
+    for i in range(num_files):
+        path = os.path.join(workdir, f"merge_{i:05d}.pdf")
+        shutil.copyfile(sample, path)
+        input_files.append(path)
+
+    print(f"merge: {num_files} files x {pages_per_file} page(s)")
+    for engine in ("pypdf2", "fitz"):
+        output_file = os.path.join(workdir, f"merged_{engine}.pdf")
+        if engine == "pypdf2":
+            elapsed, peak_mb, _ = run_isolated(pydfpro._merge_with_pypdf2, input_files, output_file)
+        else:
+            elapsed, peak_mb, _ = run_isolated(pydfpro._merge_with_fitz, input_files, output_file)
+        size_kb = os.path.getsize(output_file) / 1024
+        print(_format_row(engine, elapsed, peak_mb, f"{num_files / elapsed:8.1f} files/sec, {size_kb:.0f} KB"))
+
+def bench_extract_images(workdir, num_pages):
+    """Compares decoding extraction (default PNG output), deduplicated extraction and raw passthrough."""
+    pdf = os.path.join(workdir, "images.pdf")
+    make_image_pdf(pdf, num_pages)
+    print(f"extract-images: {num_pages} page(s), one JPEG per page plus a repeated logo")
+    variants = [
+        ("decode to png", {"image_format": "png"}),
+        ("native format", {"image_format": "jpg"}),
+        ("native + dedupe", {"image_format": "jpg", "dedupe": True}),
+        ("raw passthrough + dedupe", {"image_format": "png", "raw": True, "dedupe": True}),
+    ]
+    for name, options in variants:
+        output_dir = os.path.join(workdir, f"images_{len(os.listdir(workdir))}")
+        elapsed, peak_mb, _ = run_isolated(run_handler, "handle_extract_images", dict(options, input_file=pdf, output_dir=output_dir))
+        files = os.listdir(output_dir)
+        size_mb = sum(os.path.getsize(os.path.join(output_dir, f)) for f in files) / (1024 * 1024)
+        print(_format_row(name, elapsed, peak_mb, f"{num_pages / elapsed:8.1f} pages/sec, {len(files)} files, {size_mb:.1f} MB"))
+
+def time_open(path, repeat=5):
+    """Returns the best of `repeat` times, in seconds, to open path and load its last page with fitz and with PyPDF2."""
+    fitz_times, pypdf2_times = [], []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        doc = fitz.open(path)
+        doc.load_page(len(doc) - 1)
+        fitz_times.append(time.perf_counter() - start_time)
+        doc.close()
+        start_time = time.perf_counter()
+        reader = PdfReader(path)
+        reader.pages[len(reader.pages) - 1]
+        pypdf2_times.append(time.perf_counter() - start_time)
+    return min(fitz_times), min(pypdf2_times)
+
+def bench_object_streams(workdir, num_pages, input_file=None):
+    """Compares classic cross-reference tables with --object_streams on the outputs of a PyPDF2 writer
+    (rotate), a fitz writer (add-page-numbers) and merge: file size, write time and time to open.
+    """
+    pdf = input_file
+    if pdf is None:
+        pdf = os.path.join(workdir, "object_streams.pdf")
+        make_sample_pdf(pdf, num_pages)
+    print(f"object streams: '{os.path.basename(pdf)}', {os.path.getsize(pdf) / 1024:.0f} KB")
+    commands = {
+        "rotate": ["rotate", pdf, "90"],
+        "add-page-numbers": ["add-page-numbers", pdf],
+        "merge": ["merge", pdf, pdf],
+    }
+    for command, argv in commands.items():
+        sizes = {}
+        for variant, flags in (("classic xref", []), ("object streams", ["--object_streams"])):
+            output_file = os.path.join(workdir, f"{command}_{len(flags)}.pdf")
+            elapsed, _, (ok, output) = run_isolated(run_cli, [*flags, *argv, "-o", output_file])
+            if not ok:
+                print(f"  {command:18} {variant:15} FAILED: {output.strip().splitlines()[-1] if output.strip() else ''}")
+                continue
+            fitz_open, pypdf2_open = run_isolated(time_open, output_file)[2]
+            sizes[variant] = os.path.getsize(output_file)
+            print(f"  {command:18} {variant:15} {sizes[variant] / 1024:10.1f} KB  write {elapsed:7.3f}s  "
+                  f"open+last page: fitz {fitz_open * 1000:8.2f} ms, PyPDF2 {pypdf2_open * 1000:8.2f} ms")
+        if len(sizes) == 2:
+            print(f"  {command:18} {'':15} {1 - sizes['object streams'] / sizes['classic xref']:10.1%} smaller")
+
+def first_page_bytes(path):
+    """Returns how many bytes from the start of path a viewer must download before it can show page 1:
+    the end of the first page section (/E in the linearization dictionary) for a linearized file, and
+    the whole file otherwise, since the cross-reference table it needs to find anything is at the end.
+    """
+    with open(path, "rb") as f:
+        head = f.read(2048)
+    match = re.search(rb"/Linearized\b.*?/E\s+(\d+)", head, re.S)
+    return (int(match.group(1)), True) if match else (os.path.getsize(path), False)
+
+def time_first_page(path, repeat=5):
+    """Returns the best of `repeat` times, in seconds, to open path and render page 1 with fitz."""
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        with fitz.open(path) as doc:
+            doc.load_page(0).get_pixmap(dpi=72)
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+def bench_linearize(workdir, num_pages, mbps, input_file=None):
+    """Compares outputs with and without --linearize: file size, write time, the bytes needed before page 1
+    can be shown and the resulting time to first page over a link of `mbps` megabits per second
+    (transfer time of those bytes plus the measured time to render page 1).
+    """
+    pdf = input_file
+    if pdf is None:
+        pdf = os.path.join(workdir, "linearize.pdf")
+        make_image_pdf(pdf, num_pages, image_size=(800, 600))
+    print(f"linearize: '{os.path.basename(pdf)}', {os.path.getsize(pdf) / 1024:.0f} KB, {mbps:g} Mbit/s link")
+    commands = {
+        "rotate": ["rotate", pdf, "90"],
+        "add-page-numbers": ["add-page-numbers", pdf],
+        "compress": ["compress", pdf, "-l", "basic"],
+    }
+    for command, argv in commands.items():
+        for variant, flags in (("classic", []), ("linearized", ["--linearize"])):
+            output_file = os.path.join(workdir, f"{command}_{len(flags)}.pdf")
+            elapsed, _, (ok, output) = run_isolated(run_cli, [*flags, *argv, "-o", output_file])
+            if not ok:
+                print(f"  {command:18} {variant:11} FAILED: {output.strip().splitlines()[-1] if output.strip() else ''}")
+                continue
+            needed, linearized = first_page_bytes(output_file)
+            render = run_isolated(time_first_page, output_file)[2]
+            first_page = needed * 8 / (mbps * 1_000_000) + render
+            print(f"  {command:18} {variant:11} {os.path.getsize(output_file) / 1024:10.1f} KB  write {elapsed:7.3f}s  "
+                  f"first page after {needed / 1024:10.1f} KB{'' if linearized or not flags else ' (not linearized)'}  "
+                  f"time to first page {first_page * 1000:9.1f} ms")
+
+SUITE_CORPORA = ("text", "image")
+SUITE_PASSWORD = "bench"
+
+def _suite_corpus(corpus_dir, kind, num_pages):
+    """Returns the paths of the text-heavy or image-heavy corpus document of a given size and an encrypted
+    copy of it, generating them on first use so a --corpus_dir can be reused across runs.
+    """
+    pdf = os.path.join(corpus_dir, f"{kind}_{num_pages}.pdf")
+    encrypted = os.path.join(corpus_dir, f"{kind}_{num_pages}_encrypted.pdf")
+    if not os.path.exists(pdf):
+        if kind == "text":
+            make_sample_pdf(pdf + ".tmp", num_pages)
+        else:
+            make_image_pdf(pdf + ".tmp", num_pages, image_size=(800, 600))
+        os.replace(pdf + ".tmp", pdf)
+    if not os.path.exists(encrypted):
+        doc = fitz.open(pdf)
+        doc.save(encrypted, encryption=fitz.PDF_ENCRYPT_AES_256, owner_pw=SUITE_PASSWORD, user_pw=SUITE_PASSWORD)
+        doc.close()
+    return pdf, encrypted
+
+def _suite_scan_images(corpus_dir, num_images):
+    """Returns num_images JPEG file paths standing in for a batch of scans, for images-to-pdf."""
+    image_dir = os.path.join(corpus_dir, "scans")
+    os.makedirs(image_dir, exist_ok=True)
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 800, 600), 0)
+    pix.clear_with(128)
+    jpeg = pix.tobytes("jpeg")
+    paths = []
+    for i in range(num_images):
+        path = os.path.join(image_dir, f"scan_{i:05d}.jpg")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(jpeg)
+        paths.append(path)
+    return paths
+
+def _suite_commands(pdf, encrypted, num_pages, scans, out_dir):
+    """Returns (command, argv) for every subcommand run on one corpus document; each writes into out_dir."""
+    def out(name):
+        return os.path.join(out_dir, name)
+    for directory in ("split", "images", "renders"):
+        os.makedirs(out(directory), exist_ok=True)
+    commands = [
+        ("merge", ["merge", pdf, pdf, "-o", out("merged.pdf")]),
+        ("split", ["split", pdf, "-n", "10", "-o", out("split")]),
+        ("reorder", ["reorder", pdf, ",".join(str(i) for i in range(num_pages, 0, -1)), "-o", out("reordered.pdf")]),
+        ("delete", ["delete", pdf, "1", "-o", out("deleted.pdf")]),
+        ("rotate", ["rotate", pdf, "90", "-o", out("rotated.pdf")]),
+        ("extract-text", ["extract-text", pdf, "-o", out("text.txt")]),
+        ("extract-images", ["extract-images", pdf, "-o", out("images"), "--image_format", "jpg"]),
+        ("pdf-to-image", ["pdf-to-image", pdf, "-o", out("renders") + os.sep, "--dpi", "72"]),
+        ("add-watermark", ["add-watermark", pdf, "-o", out("watermarked.pdf"), "--text", "DRAFT"]),
+        ("add-page-numbers", ["add-page-numbers", pdf, "-o", out("numbered.pdf")]),
+        ("encrypt", ["encrypt", pdf, "-o", out("encrypted.pdf"), "--user_password", SUITE_PASSWORD]),
+        ("decrypt", ["decrypt", encrypted, SUITE_PASSWORD, "-o", out("decrypted.pdf")]),
+        ("compress", ["compress", pdf, "-o", out("compressed.pdf"), "-l", "strong"]),
+    ]
+    if scans:
+        commands.append(("images-to-pdf", ["images-to-pdf", *scans, "-o", out("from_images.pdf")]))
+    return commands
+
+def run_suite(corpus_dir, work_dir, sizes, corpora, only_commands=None):
+    """Times every subcommand on each corpus size in a fresh process. Returns {"kind/pages/command": result}."""
+    results = {}
+    print(f"{'corpus':8} {'pages':>6}  {'command':18} {'time':>9} {'pages/s':>10} {'peak RSS':>11}")
+    for kind in corpora:
+        for num_pages in sizes:
+            pdf, encrypted = _suite_corpus(corpus_dir, kind, num_pages)
+            scans = _suite_scan_images(corpus_dir, num_pages) if kind == "image" else None
+            out_dir = os.path.join(work_dir, f"{kind}_{num_pages}")
+            for command, argv in _suite_commands(pdf, encrypted, num_pages, scans, out_dir):
+                if only_commands and command not in only_commands:
+                    continue
+                elapsed, peak_mb, (ok, output) = run_isolated(run_cli, argv)
+                results[f"{kind}/{num_pages}/{command}"] = {
+                    "corpus": kind, "pages": num_pages, "command": command, "ok": ok,
+                    "elapsed_s": round(elapsed, 4), "pages_per_s": round(num_pages / elapsed, 1) if elapsed > 0 else None,
+                    "peak_rss_mb": round(peak_mb, 1) if peak_mb is not None else None,
+                }
+                peak = f"{peak_mb:8.1f} MB" if peak_mb is not None else "       n/a"
+                status = "" if ok else "  FAILED: " + (output.strip().splitlines() or [""])[-1][:80]
+                print(f"{kind:8} {num_pages:6}  {command:18} {elapsed:8.3f}s {num_pages / elapsed:10.1f} {peak}{status}")
+            shutil.rmtree(out_dir, ignore_errors=True) # Outputs of large corpora add up quickly
+    return results
+
+def compare_to_baseline(results, baseline, threshold, min_delta_s=0.05):
+    """Returns a list of regression descriptions: runs that got slower or used more memory than the
+    baseline by more than threshold (a fraction), ignoring timing differences below min_delta_s.
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        if base["ok"] and not result["ok"]:
+            regressions.append(f"{key}: now fails")
+            continue
+        if not (base["ok"] and result["ok"]):
+            continue
+        if result["elapsed_s"] > base["elapsed_s"] * (1 + threshold) and result["elapsed_s"] - base["elapsed_s"] > min_delta_s:
+            regressions.append(f"{key}: {base['elapsed_s']:.3f}s -> {result['elapsed_s']:.3f}s (+{result['elapsed_s'] / base['elapsed_s'] - 1:.0%})")
+        if base.get("peak_rss_mb") and result.get("peak_rss_mb") and result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+            regressions.append(f"{key}: peak RSS {base['peak_rss_mb']:.1f} MB -> {result['peak_rss_mb']:.1f} MB")
+    return regressions
+
+def bench_suite(args):
+    sizes = [int(size) for size in args.sizes.split(",")]
+    corpora = [kind.strip() for kind in args.corpora.split(",")]
+    unknown = set(corpora) - set(SUITE_CORPORA)
+    if unknown:
+        print(f"Error: Unknown corpus type(s): {', '.join(sorted(unknown))}. Choose from: {', '.join(SUITE_CORPORA)}.")
+        return 2
+    only_commands = set(args.commands.split(",")) if args.commands else None
+
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix="pydfpro_corpus_")
+    os.makedirs(corpus_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="pydfpro_suite_")
+    try:
+        results = run_suite(corpus_dir, work_dir, sizes, corpora, only_commands)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if not args.corpus_dir:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    exit_code = 0
+    failed = [key for key, result in results.items() if not result["ok"]]
+    if failed:
+        print(f"\n{len(failed)} run(s) failed: {', '.join(failed)}")
+
+    # PRD NFR-001: operations on documents under 200 pages should complete within seconds
+    slow = [key for key, result in results.items() if result["ok"] and result["pages"] < 200 and result["elapsed_s"] > args.nfr_seconds]
+    print(f"\nNFR-001 (<200 pages within {args.nfr_seconds:g}s): " + ("met" if not slow else "NOT met by " + ", ".join(slow)))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%} against '{args.baseline}':")
+            for regression in regressions:
+                print(f"  {regression}")
+            exit_code = 1
+        else:
+            print(f"\nNo regressions beyond {args.threshold:.0%} against '{args.baseline}'.")
+
+    if args.save_baseline:
+        report = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pymupdf": fitz.VersionBind,
+            "platform": platform.platform(),
+            "results": results,
+        }
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to '{args.save_baseline}'.")
+    return exit_code
+
+def main():
+    parser = argparse.ArgumentParser(description="PyDF Pro performance benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    merge_parser = subparsers.add_parser("merge", help="Compare merge engines.")
+    merge_parser.add_argument("--files", type=int, default=500, help="Number of input PDFs (default: 500).")
+    merge_parser.add_argument("--pages", type=int, default=3, help="Pages per input PDF (default: 3).")
+
+    images_parser = subparsers.add_parser("extract-images", help="Compare image extraction modes.")
+    images_parser.add_argument("--pages", type=int, default=200, help="Number of pages, each with its own image (default: 200).")
+
+    objstm_parser = subparsers.add_parser("object-streams", help="Compare output size and open time with and without --object_streams.")
+    objstm_parser.add_argument("--pages", type=int, default=2000, help="Pages in the generated text document (default: 2000).")
+    objstm_parser.add_argument("--input", help="Measure on this PDF instead of a generated one.")
+
+    linearize_parser = subparsers.add_parser("linearize", help="Compare the time to first page of outputs with and without --linearize.")
+    linearize_parser.add_argument("--pages", type=int, default=200, help="Pages in the generated image document (default: 200).")
+    linearize_parser.add_argument("--mbps", type=float, default=50.0, help="Simulated download speed in megabits per second (default: 50).")
+    linearize_parser.add_argument("--input", help="Measure on this PDF instead of a generated one.")
+
+    suite_parser = subparsers.add_parser("suite", help="Time every subcommand on synthetic corpora of increasing size.")
+    suite_parser.add_argument("--sizes", default="10,100,1000,10000", help="Comma-separated corpus sizes in pages (default: 10,100,1000,10000).")
+    suite_parser.add_argument("--corpora", default="text,image", help="Comma-separated corpus types: text (text-heavy) and/or image (one JPEG per page). Default: both.")
+    suite_parser.add_argument("--commands", help="Comma-separated subset of subcommands to time (default: all).")
+    suite_parser.add_argument("--corpus_dir", help="Directory to keep generated corpora in so later runs can reuse them (default: a temporary directory).")
+    suite_parser.add_argument("--save_baseline", metavar="JSON", help="Write the results to this file as a baseline.")
+    suite_parser.add_argument("--baseline", metavar="JSON", help="Compare against this baseline and exit with status 1 on regressions.")
+    suite_parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown or memory growth, as a fraction, that counts as a regression (default: 0.2).")
+    suite_parser.add_argument("--nfr_seconds", type=float, default=5.0, help="Time limit used to check PRD NFR-001 on corpora under 200 pages (default: 5).")
+
+    args = parser.parse_args()
+    if args.benchmark == "suite":
+        sys.exit(bench_suite(args))
+    workdir = tempfile.mkdtemp(prefix="pydfpro_bench_")
+    try:
+        if args.benchmark == "merge":
+            bench_merge(workdir, args.files, args.pages)
+        elif args.benchmark == "extract-images":
+            bench_extract_images(workdir, args.pages)
+        elif args.benchmark == "object-streams":
+            bench_object_streams(workdir, args.pages, args.input)
+        elif args.benchmark == "linearize":
+            bench_linearize(workdir, args.pages, args.mbps, args.input)
+    finally:
+        shutil.rmtree(workdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Thin client for `pydfpro serve`.
+
+Uses only the standard library so submitting a job does not pay for importing the PDF libraries:
+
+    python pydfpro_client.py rotate in.pdf 90 -o out.pdf
+    python pydfpro_client.py --jobs jobs.txt
+"""
+import argparse
+import json
+import os
+import shlex
+import socket
+import tempfile
+import time
+
+# A per-user directory: the server creates it with mode 0700 and its socket with mode 0600
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f"pydfpro-{os.getuid()}" if hasattr(os, "getuid") else "pydfpro", "pydfpro.sock")
+
+def submit_jobs(jobs, socket_path=DEFAULT_SOCKET):
+    """Sends jobs to a running `pydfpro serve` and yields a result dictionary (id, ok, output, elapsed_s)
+    for each as it finishes. A job is an argv list such as ["rotate", "in.pdf", "90", "-o", "out.pdf"],
+    or a dict with "argv" and an optional "id"; ids default to the job's 1-based position.
+    """
+    lines = []
+    for job_num, job in enumerate(jobs, 1):
+        job = dict(job) if isinstance(job, dict) else {"argv": list(job)}
+        job.setdefault("id", job_num)
+        job.setdefault("cwd", os.getcwd())
+        lines.append(json.dumps(job) + "\n")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall("".join(lines).encode("utf-8"))
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("r", encoding="utf-8") as replies:
+            for line in replies:
+                if line.strip():
+                    yield json.loads(line)
+
+def _load_job_file(jobs_file):
+    """Reads jobs one per line: a JSON argv list or job object, or a shell-style command line.
+    Blank lines and lines starting with '#' are ignored.
+    """
+    jobs = []
+    with open(jobs_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            jobs.append(json.loads(line) if line[0] in "[{" else shlex.split(line))
+    return jobs
+
+def handle_submit(args):
+    job_argv = list(args.job_argv)
+    if job_argv and job_argv[0] == "--":
+        job_argv = job_argv[1:]
+    try:
+        jobs = _load_job_file(args.jobs) if args.jobs else []
+    except FileNotFoundError:
+        print(f"Error: Jobs file '{args.jobs}' not found.")
+        return
+    except ValueError as e:
+        print(f"Error: Invalid jobs file '{args.jobs}': {e}")
+        return
+    if job_argv:
+        jobs.append(job_argv)
+    if not jobs:
+        print("Error: Nothing to submit. Give a command line (e.g. rotate in.pdf 90 -o out.pdf) or --jobs FILE.")
+        return
+
+    start_time = time.perf_counter()
+    failed = 0
+    try:
+        for done, result in enumerate(submit_jobs(jobs, args.socket), 1):
+            failed += not result["ok"]
+            if len(jobs) == 1:
+                print(result["output"], end="")
+            else:
+                last_line = result["output"].strip().splitlines()[-1] if result["output"].strip() else ""
+                print(f"[{done}/{len(jobs)}] {'OK  ' if result['ok'] else 'FAIL'} job {result['id']} ({result['elapsed_s']:.2f}s){': ' + last_line if not result['ok'] and last_line else ''}")
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"Error: No server is listening on '{args.socket}'. Start one with: pydfpro serve --socket {args.socket}")
+        return
+    if len(jobs) > 1:
+        print(f"\nSubmitted {len(jobs)} job(s): {len(jobs) - failed} succeeded, {failed} failed ({time.perf_counter() - start_time:.2f}s).")
+
+def add_submit_arguments(parser):
+    """Adds the submit options to parser; shared with the `pydfpro submit` subcommand."""
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help=f"Unix socket path of the server (default: {DEFAULT_SOCKET}).")
+    parser.add_argument("-j", "--jobs", help="File with one job per line, as a command line or a JSON argv list. Runs before an inline job.")
+    parser.add_argument("job_argv", nargs=argparse.REMAINDER, help="A command line to run, as for pydfpro itself.")
+    parser.set_defaults(func=handle_submit)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send jobs to a running 'pydfpro serve' and print their results.", prog="pydfpro_client",
+                                     epilog="Options must come before the job's command line.")
+    add_submit_arguments(parser)
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
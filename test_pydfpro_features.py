@@ -4,9 +4,16 @@ import tempfile
 from pydfpro import (
     handle_merge, handle_split, handle_reorder, handle_delete, handle_rotate,
     handle_extract_text, handle_extract_images, handle_pdf_to_image, handle_images_to_pdf,
-    handle_add_watermark, handle_add_page_numbers, handle_encrypt, handle_decrypt, handle_compress
+    handle_add_watermark, handle_add_page_numbers, handle_encrypt, handle_decrypt, handle_compress,
+    handle_batch, handle_pipeline, PdfJob, profiling
 )
+from pydfpro import main as pydfpro_main, _start_job_server, _run_served_job, _open_fitz, _open_reader, _parse_inline_step
+from pydfpro_client import submit_jobs
+import io
+import json
+import threading
 from PyPDF2 import PdfReader
+import fitz
 from PIL import Image, ImageDraw
 
 def create_sample_pdf(path, num_pages=3, text_prefix="Page"):
@@ -39,6 +46,41 @@ def test_merge(tempdir):
     handle_merge(Args)
     return file_exists(out) and len(PdfReader(out).pages) == 5
 
+def test_merge_engines(tempdir):
+    inputs = []
+    for i in range(3):
+        path = os.path.join(tempdir, f"merge_engine{i}.pdf")
+        create_sample_pdf(path, 2, f"Part{i}")
+        inputs.append(path)
+    class Args: pass
+    Args.input_files = inputs
+    Args.output_file = os.path.join(tempdir, "merged_fitz.pdf")
+    Args.engine = "fitz"
+    Args.flush_every = 1 # Exercise the incremental flush on every input
+    handle_merge(Args)
+    Args.output_file = os.path.join(tempdir, "merged_pypdf2.pdf")
+    Args.engine = "pypdf2"
+    handle_merge(Args)
+    fitz_reader = PdfReader(os.path.join(tempdir, "merged_fitz.pdf"))
+    return (len(fitz_reader.pages) == 6 and "Part2 2" in fitz_reader.pages[5].extract_text()
+            and len(PdfReader(os.path.join(tempdir, "merged_pypdf2.pdf")).pages) == 6)
+
+def test_merge_bookmarks(tempdir):
+    inputs = []
+    for i in range(2):
+        path = os.path.join(tempdir, f"merge_toc{i}.pdf")
+        create_sample_pdf(path, 3, f"Toc{i}")
+        doc = fitz.open(path)
+        doc.set_toc([[1, f"Chapter {i}", 1], [2, f"Section {i}", 3]])
+        doc.saveIncr()
+        doc.close()
+        inputs.append(path)
+    merged = os.path.join(tempdir, "merged_toc.pdf")
+    pydfpro_main(["merge", *inputs, "-o", merged, "--flush_every", "1"])
+    with fitz.open(merged) as doc:
+        toc = doc.get_toc()
+    return toc == [[1, "Chapter 0", 1], [2, "Section 0", 3], [1, "Chapter 1", 4], [2, "Section 1", 6]]
+
 def test_split(tempdir):
     pdf = os.path.join(tempdir, "split.pdf")
     create_sample_pdf(pdf, 4)
@@ -54,6 +96,24 @@ def test_split(tempdir):
     files = [f for f in os.listdir(out_dir) if f.endswith('.pdf')]
     return len(files) == 2
 
+def test_split_parallel(tempdir):
+    pdf = os.path.join(tempdir, "split_parallel.pdf")
+    create_sample_pdf(pdf, 6)
+    out_dir = os.path.join(tempdir, "split_parallel_out")
+    os.makedirs(out_dir)
+    class Args: pass
+    Args.input_file = pdf
+    Args.output_path = out_dir
+    Args.ranges = None
+    Args.every_n_pages = None
+    Args.each_page = True
+    Args.workers = 2
+    Args.optimize_resources = True
+    handle_split(Args)
+    expected = {f"split_parallel_page_{i}.pdf" for i in range(1, 7)}
+    return (set(os.listdir(out_dir)) == expected
+            and "Page 4" in PdfReader(os.path.join(out_dir, "split_parallel_page_4.pdf")).pages[0].extract_text())
+
 def test_reorder(tempdir):
     pdf = os.path.join(tempdir, "reorder.pdf")
     out = os.path.join(tempdir, "reordered.pdf")
@@ -88,6 +148,23 @@ def test_rotate(tempdir):
     handle_rotate(Args)
     return file_exists(out)
 
+def test_rotate_incremental(tempdir):
+    pdf = os.path.join(tempdir, "rotate_incremental.pdf")
+    create_sample_pdf(pdf, 3)
+    with open(pdf, "rb") as f:
+        original = f.read()
+    class Args: pass
+    Args.input_file = pdf
+    Args.pages = "2"
+    Args.angle = 180
+    Args.output_file = None
+    Args.incremental = True
+    handle_rotate(Args)
+    with open(pdf, "rb") as f:
+        updated = f.read()
+    # An incremental update leaves the original bytes untouched and only appends
+    return updated.startswith(original) and len(updated) > len(original) and PdfReader(pdf).pages[1].rotation == 180
+
 def test_extract_text(tempdir):
     pdf = os.path.join(tempdir, "extract_text.pdf")
     out = os.path.join(tempdir, "extracted.txt")
@@ -98,6 +175,34 @@ def test_extract_text(tempdir):
     handle_extract_text(Args)
     return file_exists(out) and "ExtractMe" in open(out, encoding="utf-8").read()
 
+def test_extract_text_separator(tempdir):
+    pdf = os.path.join(tempdir, "extract_text_sep.pdf")
+    out = os.path.join(tempdir, "extracted_sep.txt")
+    create_sample_pdf(pdf, 3, "Streamed")
+    class Args: pass
+    Args.input_file = pdf
+    Args.output_file = out
+    Args.page_separator = "=== {page_num} ==="
+    handle_extract_text(Args)
+    text = open(out, encoding="utf-8").read()
+    return all(f"=== {i} ===" in text for i in range(1, 4)) and text.index("Streamed 1") < text.index("=== 2 ===") < text.index("Streamed 2")
+
+def test_extract_text_parallel(tempdir):
+    pdf = os.path.join(tempdir, "extract_text_parallel.pdf")
+    serial_out = os.path.join(tempdir, "extracted_serial.txt")
+    parallel_out = os.path.join(tempdir, "extracted_parallel.txt")
+    create_sample_pdf(pdf, 12, "Chunked")
+    class Args: pass
+    Args.input_file = pdf
+    Args.page_separator = "--- {page_num} ---"
+    Args.output_file = serial_out
+    Args.workers = 1
+    handle_extract_text(Args)
+    Args.output_file = parallel_out
+    Args.workers = 3
+    handle_extract_text(Args)
+    return file_exists(parallel_out) and open(serial_out, encoding="utf-8").read() == open(parallel_out, encoding="utf-8").read()
+
 def test_extract_images(tempdir):
     pdf = os.path.join(tempdir, "extract_images.pdf")
     out_dir = os.path.join(tempdir, "img_out")
@@ -119,6 +224,72 @@ def test_extract_images(tempdir):
     files = [f for f in os.listdir(out_dir) if f.lower().endswith((".png",".jpg",".jpeg"))]
     return len(files) >= 1
 
+def test_extract_images_dedupe(tempdir):
+    pdf = os.path.join(tempdir, "extract_images_dedupe.pdf")
+    out_dir = os.path.join(tempdir, "img_dedupe_out")
+    img_path = os.path.join(tempdir, "logo.png")
+    create_sample_image(img_path, "blue")
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+    c = canvas.Canvas(pdf, pagesize=letter)
+    for _ in range(4): # The same logo on every page
+        c.drawImage(img_path, 100, 600, width=50, height=50)
+        c.showPage()
+    c.save()
+    class Args: pass
+    Args.input_file = pdf
+    Args.output_dir = out_dir
+    Args.image_format = "png"
+    Args.dedupe = True
+    handle_extract_images(Args)
+    import json
+    with open(os.path.join(out_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    images = [f for f in os.listdir(out_dir) if f.endswith(".png")]
+    return (len(images) == 1 and len(manifest["occurrences"]) == 4
+            and all(o["file"] == images[0] for o in manifest["occurrences"]))
+
+def test_extract_images_parallel(tempdir):
+    pdf = os.path.join(tempdir, "extract_images_parallel.pdf")
+    out_dir = os.path.join(tempdir, "img_parallel_out")
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+    c = canvas.Canvas(pdf, pagesize=letter)
+    for i, color in enumerate(["red", "green", "blue", "yellow"]):
+        img_path = os.path.join(tempdir, f"parallel_{color}.png")
+        create_sample_image(img_path, color)
+        c.drawImage(img_path, 100, 600, width=50, height=50)
+        c.showPage()
+    c.save()
+    class Args: pass
+    Args.input_file = pdf
+    Args.output_dir = out_dir
+    Args.image_format = "jpg" # Forces a transcode in the worker processes
+    Args.workers = 2
+    Args.queue_size = 1
+    handle_extract_images(Args)
+    return sorted(os.listdir(out_dir)) == [f"image_p{i}_1.jpg" for i in range(1, 5)]
+
+def test_extract_images_raw(tempdir):
+    pdf = os.path.join(tempdir, "extract_images_raw.pdf")
+    out_dir = os.path.join(tempdir, "img_raw_out")
+    img_path = os.path.join(tempdir, "photo.jpg")
+    create_sample_image(img_path, "purple")
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+    c = canvas.Canvas(pdf, pagesize=letter)
+    c.drawImage(img_path, 100, 600, width=50, height=50) # reportlab embeds JPEG files as DCTDecode streams
+    c.showPage()
+    c.save()
+    class Args: pass
+    Args.input_file = pdf
+    Args.output_dir = out_dir
+    Args.image_format = "png"
+    Args.raw = True
+    handle_extract_images(Args)
+    raw_path = os.path.join(out_dir, "image_p1_1.jpg")
+    return file_exists(raw_path) and open(raw_path, "rb").read(2) == b"\xff\xd8"
+
 def test_pdf_to_image(tempdir):
     pdf = os.path.join(tempdir, "pdf2img.pdf")
     out_dir = os.path.join(tempdir, "pdf2img_out")
@@ -134,6 +305,50 @@ def test_pdf_to_image(tempdir):
     files = [f for f in os.listdir(out_dir) if f.lower().endswith('.png')]
     return len(files) == 2
 
+def test_pdf_to_image_parallel(tempdir):
+    pdf = os.path.join(tempdir, "pdf2img_parallel.pdf")
+    out_dir = os.path.join(tempdir, "pdf2img_parallel_out")
+    os.makedirs(out_dir)
+    create_sample_pdf(pdf, 5)
+    class Args: pass
+    Args.input_file = pdf
+    Args.output_dir_or_pattern = out_dir
+    Args.pages = None
+    Args.format = "png"
+    Args.dpi = 50
+    Args.workers = 2
+    handle_pdf_to_image(Args)
+    expected = {f"pdf2img_parallel_page_{i}.png" for i in range(1, 6)}
+    return set(os.listdir(out_dir)) == expected
+
+def test_pdf_to_image_cache(tempdir):
+    pdf = os.path.join(tempdir, "pdf2img_cache.pdf")
+    cache_dir = os.path.join(tempdir, "render_cache")
+    create_sample_pdf(pdf, 2)
+    class Args: pass
+    Args.input_file = pdf
+    Args.pages = None
+    Args.format = "png"
+    Args.dpi = 60
+    Args.cache_dir = cache_dir
+    Args.cache_size_mb = 64
+    Args.output_dir_or_pattern = os.path.join(tempdir, "pdf2img_cache_first") + os.sep
+    handle_pdf_to_image(Args)
+    cached_entries = sum(len(files) for _, _, files in os.walk(cache_dir))
+    Args.output_dir_or_pattern = os.path.join(tempdir, "pdf2img_cache_second") + os.sep
+    # A warm run must be served from the cache without rendering anything
+    renders = []
+    get_pixmap = fitz.Page.get_pixmap
+    fitz.Page.get_pixmap = lambda page, *args, **kwargs: renders.append(page.number) or get_pixmap(page, *args, **kwargs)
+    try:
+        handle_pdf_to_image(Args)
+    finally:
+        fitz.Page.get_pixmap = get_pixmap
+    second = os.path.join(tempdir, "pdf2img_cache_second", "pdf2img_cache_page_2.png")
+    first = os.path.join(tempdir, "pdf2img_cache_first", "pdf2img_cache_page_2.png")
+    return (cached_entries == 2 and not renders and file_exists(second)
+            and open(first, "rb").read() == open(second, "rb").read())
+
 def test_images_to_pdf(tempdir):
     img1 = os.path.join(tempdir, "img1.png")
     img2 = os.path.join(tempdir, "img2.png")
@@ -147,6 +362,43 @@ def test_images_to_pdf(tempdir):
     handle_images_to_pdf(Args)
     return file_exists(out) and len(PdfReader(out).pages) == 2
 
+def test_images_to_pdf_parallel(tempdir):
+    imgs = []
+    for i in range(5):
+        path = os.path.join(tempdir, f"par_img{i}.png")
+        create_sample_image(path, "red", size=(100 + i * 10, 100))
+        imgs.append(path)
+    out = os.path.join(tempdir, "imgs2pdf_parallel.pdf")
+    class Args: pass
+    Args.input_files = imgs
+    Args.output_file = out
+    Args.workers = 2
+    Args.flush_every = 2 # Exercise the incremental flush
+    handle_images_to_pdf(Args)
+    if not file_exists(out) or os.path.exists(out + ".partial"):
+        return False
+    widths = [float(page.mediabox.width) for page in PdfReader(out).pages]
+    return len(widths) == 5 and widths == sorted(set(widths)) # Pages stay in input order
+
+def test_images_to_pdf_jpeg_passthrough(tempdir):
+    jpg = os.path.join(tempdir, "passthrough.jpg")
+    Image.new("RGB", (300, 200), "blue").save(jpg, quality=90, dpi=(150, 150))
+    outputs = {}
+    for mode in ("passthrough", "converted"):
+        class Args: pass
+        Args.input_files = [jpg]
+        Args.output_file = os.path.join(tempdir, f"jpeg_{mode}.pdf")
+        Args.no_passthrough = mode == "converted"
+        handle_images_to_pdf(Args)
+        outputs[mode] = PdfReader(Args.output_file).pages[0]
+    xobjects = outputs["passthrough"]["/Resources"]["/XObject"]
+    image = xobjects[list(xobjects.keys())[0]].get_object()
+    with open(jpg, "rb") as f:
+        original = f.read()
+    # Same page geometry as the regular conversion, with the JPEG data carried verbatim
+    return (image["/Filter"] == "/DCTDecode" and image._data == original
+            and outputs["passthrough"].mediabox == outputs["converted"].mediabox == [0, 0, 144, 96])
+
 def test_add_watermark(tempdir):
     pdf = os.path.join(tempdir, "wm.pdf")
     out = os.path.join(tempdir, "wm_out.pdf")
@@ -167,6 +419,54 @@ def test_add_watermark(tempdir):
     handle_add_watermark(Args)
     return file_exists(out)
 
+def test_add_watermark_shared_stamp(tempdir):
+    pdf = os.path.join(tempdir, "wm_shared.pdf")
+    out = os.path.join(tempdir, "wm_shared_out.pdf")
+    create_sample_pdf(pdf, 5)
+    class Args: pass
+    Args.input_file = pdf
+    Args.output_file = out
+    Args.pages = None
+    Args.text = "STAMPED"
+    Args.image = None
+    Args.font_name = "helv"
+    Args.font_size = 30
+    Args.color = "1,0,0"
+    Args.opacity = 0.5
+    Args.rotate = 0
+    Args.position = "center"
+    handle_add_watermark(Args)
+    if not file_exists(out):
+        return False
+    pages = PdfReader(out).pages
+    # Every page after the first references the first page's stamp XObject instead of carrying its own copy
+    first_refs = {ref.idnum for ref in pages[0]["/Resources"]["/XObject"].values()}
+    shared = all(pages[i]["/Resources"]["/XObject"].raw_get("/fzWatermark").idnum in first_refs for i in range(1, 5))
+    return shared and all("STAMPED" in page.extract_text() for page in pages)
+
+def test_add_watermark_indirect_contents(tempdir):
+    pdf = os.path.join(tempdir, "wm_indirect.pdf")
+    out = os.path.join(tempdir, "wm_indirect_out.pdf")
+    create_sample_pdf(pdf, 6, "Hello")
+    doc = fitz.open(pdf)
+    # All pages share one Resources object, and page 2's /Contents is an indirect reference to an array
+    resources_xref = doc.get_new_xref()
+    doc.update_object(resources_xref, doc.xref_get_key(doc[0].xref, "Resources")[1])
+    for page in doc:
+        doc.xref_set_key(page.xref, "Resources", f"{resources_xref} 0 R")
+    array_xref = doc.get_new_xref()
+    doc.update_object(array_xref, f"[{doc.xref_get_key(doc[1].xref, 'Contents')[1]}]")
+    doc.xref_set_key(doc[1].xref, "Contents", f"{array_xref} 0 R")
+    doc.saveIncr()
+    objects_before = doc.xref_length()
+    doc.close()
+    pydfpro_main(["add-watermark", pdf, "--text", "DRAFT", "-o", out])
+    with fitz.open(out) as doc:
+        texts = [page.get_text() for page in doc]
+        objects_added = doc.xref_length() - objects_before
+    # The original text survives, and pages sharing a Resources dict reuse the stamp instead of adding objects
+    return all(f"Hello {i + 1}" in text and "DRAFT" in text for i, text in enumerate(texts)) and objects_added <= 10
+
 def test_add_page_numbers(tempdir):
     pdf = os.path.join(tempdir, "pn.pdf")
     out = os.path.join(tempdir, "pn_out.pdf")
@@ -184,6 +484,28 @@ def test_add_page_numbers(tempdir):
     handle_add_page_numbers(Args)
     return file_exists(out)
 
+def test_add_page_numbers_layout(tempdir):
+    pdf = os.path.join(tempdir, "pn_layout.pdf")
+    out = os.path.join(tempdir, "pn_layout_out.pdf")
+    create_sample_pdf(pdf, 12)
+    class Args: pass
+    Args.input_file = pdf
+    Args.output_file = out
+    Args.pages = "2-12"
+    Args.position = "footer-right"
+    Args.start_number = 1
+    Args.font_name = "helv"
+    Args.font_size = 10
+    Args.font_color = "0,0,0"
+    Args.format_string = "Page {page_num} of {total_pages}"
+    handle_add_page_numbers(Args)
+    if not file_exists(out):
+        return False
+    pages = PdfReader(out).pages
+    # Numbering starts on the first selected page and every label is actually drawn
+    return "of 12" not in pages[0].extract_text() and all(
+        f"Page {i} of 12" in pages[i].extract_text() for i in range(1, 12))
+
 def test_encrypt_decrypt(tempdir):
     pdf = os.path.join(tempdir, "enc.pdf")
     enc = os.path.join(tempdir, "enc_out.pdf")
@@ -218,23 +540,248 @@ def test_compress(tempdir):
     handle_compress(Args)
     return file_exists(out)
 
+def test_compress_images(tempdir):
+    pdf = os.path.join(tempdir, "compress_scan.pdf")
+    out = os.path.join(tempdir, "compress_scan_out.pdf")
+    photo = os.path.join(tempdir, "compress_photo.jpg")
+    img = Image.effect_noise((1200, 1200), 60).convert("RGB") # Noise keeps the JPEG large
+    img.save(photo, quality=95)
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_image(fitz.Rect(72, 72, 216, 216), filename=photo) # 1200 px over 2 inches: 600 DPI
+    doc.save(pdf)
+    doc.close()
+    class Args: pass
+    Args.input_file = pdf
+    Args.output_file = out
+    Args.level = "strong"
+    Args.image_dpi = 150
+    Args.jpeg_quality = 60
+    Args.workers = 1
+    handle_compress(Args)
+    with fitz.open(out) as doc:
+        xref, _, width, height = doc[0].get_images()[0][:4]
+        filters = doc.xref_get_key(xref, "Filter")[1]
+    return width == 300 and height == 300 and filters == "/DCTDecode" and os.path.getsize(out) < os.path.getsize(pdf) / 4
+
+def test_compress_fonts(tempdir):
+    import reportlab
+    font_file = os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf")
+    pdf = os.path.join(tempdir, "compress_fonts.pdf")
+    out = os.path.join(tempdir, "compress_fonts_out.pdf")
+    # Two statements embedding the same font, as from different producers: the stream keys differ
+    doc = fitz.open()
+    for i in range(2):
+        part = fitz.open()
+        page = part.new_page()
+        page.insert_font(fontname="vera", fontfile=font_file)
+        page.insert_text((72, 72), f"Statement {i + 1}", fontname="vera")
+        if i:
+            xref = next(x for x in range(1, part.xref_length()) if part.xref_get_key(x, "Type")[1] == "/FontDescriptor")
+            part.xref_set_key(int(part.xref_get_key(xref, "FontFile2")[1].split()[0]), "Length1", "null")
+        doc.insert_pdf(part)
+    doc.save(pdf)
+    doc.close()
+    class Args: pass
+    Args.input_file = pdf
+    Args.output_file = out
+    Args.level = "basic"
+    handle_compress(Args)
+    with fitz.open(out) as doc:
+        programs = {doc.xref_get_key(x, "FontFile2")[1] for x in range(1, doc.xref_length()) if doc.xref_get_key(x, "Type")[1] == "/FontDescriptor"}
+        texts = [page.get_text().strip() for page in doc]
+    return len(programs) == 1 and texts == ["Statement 1", "Statement 2"] and os.path.getsize(out) < os.path.getsize(pdf) * 0.6
+
+def test_batch(tempdir):
+    in_dir = os.path.join(tempdir, "batch_in")
+    out_dir = os.path.join(tempdir, "batch_out")
+    os.makedirs(in_dir)
+    for name in ("one", "two", "three"):
+        create_sample_pdf(os.path.join(in_dir, f"{name}.pdf"), 2)
+    class Args: pass
+    Args.inputs = [in_dir]
+    Args.manifest = None
+    Args.output_dir = out_dir
+    Args.workers = 2
+    Args.operation = "rotate"
+    Args.op_args = ["90", "-p", "1"]
+    handle_batch(Args)
+    outputs = sorted(os.listdir(out_dir))
+    return outputs == ["one.pdf", "three.pdf", "two.pdf"] and PdfReader(os.path.join(out_dir, "one.pdf")).pages[0].rotation == 90
+
+def test_serve(tempdir):
+    pdf = os.path.join(tempdir, "serve_in.pdf")
+    create_sample_pdf(pdf, 3)
+    server = _start_job_server(os.path.join(tempdir, "serve.sock"), workers=2, max_queue=1)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        # More jobs than workers + queue slots: the server waits for room instead of dropping any
+        jobs = [["rotate", pdf, "90", "-o", os.path.join(tempdir, f"served_{i}.pdf")] for i in range(5)]
+        jobs.append({"argv": ["delete", pdf, "9", "-o", os.path.join(tempdir, "served_bad.pdf")], "id": "bad"})
+        results = {result["id"]: result for result in submit_jobs(jobs, server.server_address)}
+        private_socket = os.stat(server.server_address).st_mode & 0o777 == 0o600
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.job_pool.shutdown()
+        thread.join()
+    # A job's working directory must not leak into the next job run by the same worker
+    job_dir = os.path.join(tempdir, "serve_cwd")
+    os.makedirs(job_dir)
+    cwd_before = os.getcwd()
+    relative_ok = _run_served_job(["rotate", pdf, "90", "-o", "served_relative.pdf"], job_dir)[0]
+    return (all(results[i]["ok"] for i in range(1, 6)) and not results["bad"]["ok"] and private_socket
+            and PdfReader(os.path.join(tempdir, "served_4.pdf")).pages[0].rotation == 90
+            and relative_ok and os.getcwd() == cwd_before and file_exists(os.path.join(job_dir, "served_relative.pdf")))
+
+def test_object_streams(tempdir):
+    pdf = os.path.join(tempdir, "objstm.pdf")
+    create_sample_pdf(pdf, 20)
+    outputs = {}
+    for name, argv in (("rotate", ["rotate", pdf, "90"]), ("merge", ["merge", pdf, pdf])):
+        for flags in ([], ["--object_streams"]):
+            outputs[name, bool(flags)] = os.path.join(tempdir, f"objstm_{name}_{len(flags)}.pdf")
+            pydfpro_main([*flags, *argv, "-o", outputs[name, bool(flags)]])
+    def packed(path):
+        with open(path, "rb") as f:
+            return b"/ObjStm" in f.read()
+    return all(packed(outputs[name, True]) and not packed(outputs[name, False])
+               and os.path.getsize(outputs[name, True]) < os.path.getsize(outputs[name, False])
+               and len(PdfReader(outputs[name, True]).pages) == len(PdfReader(outputs[name, False]).pages)
+               for name in ("rotate", "merge"))
+
+def test_linearize(tempdir):
+    pdf = os.path.join(tempdir, "linearize.pdf")
+    create_sample_pdf(pdf, 10)
+    outputs = [os.path.join(tempdir, f"linearize_{name}.pdf") for name in ("rotate", "merge", "pipeline")]
+    pydfpro_main(["--linearize", "rotate", pdf, "90", "-o", outputs[0]])
+    pydfpro_main(["--linearize", "merge", pdf, pdf, "-o", outputs[1]])
+    pydfpro_main(["--linearize", "pipeline", pdf, "-o", outputs[2], "-s", "add-page-numbers"])
+    def linearized(path):
+        with open(path, "rb") as f:
+            return b"/Linearized" in f.read(1024)
+    return (all(linearized(path) for path in outputs) and not linearized(pdf)
+            and [len(PdfReader(path).pages) for path in outputs] == [10, 20, 10])
+
+def test_mmap_input(tempdir):
+    pdf = os.path.join(tempdir, "mmap.pdf")
+    create_sample_pdf(pdf, 6)
+    reader = _open_reader(pdf, 0)
+    doc = _open_fitz(pdf, 0)
+    mapped = type(reader.stream).__name__ == "mmap" and isinstance(doc.stream, memoryview) and len(doc) == 6
+    doc.close()
+    unmapped = isinstance(_open_reader(pdf, -1).stream, io.BytesIO)
+    # Overwriting a mapped input must replace the file instead of truncating it while it is read
+    pydfpro_main(["--mmap_threshold", "0", "rotate", pdf, "90", "-o", pdf])
+    pydfpro_main(["--mmap_threshold", "0", "split", pdf, "-r", "1-2", "-o", os.path.join(tempdir, "mmap_part.pdf")])
+    rotated = PdfReader(pdf)
+    return (mapped and unmapped and len(rotated.pages) == 6 and rotated.pages[0].rotation == 90
+            and len(PdfReader(os.path.join(tempdir, "mmap_part.pdf")).pages) == 2)
+
+def test_pdf_job(tempdir):
+    pdf = os.path.join(tempdir, "job.pdf")
+    out = os.path.join(tempdir, "job_out.pdf")
+    create_sample_pdf(pdf, 4, "Job")
+    with open(pdf, "rb") as f:
+        data = f.read()
+    with PdfJob(data) as job:
+        job.rotate(90, pages="1")
+        deleted = job.delete([4])
+        job.reorder("3,1,2")
+        job.add_page_numbers()
+        text = job.extract_text()["text"]
+        saved = job.save(out)
+        operations = [result["operation"] for result in job.history]
+        payload_kept = any(key in result for result in job.history for key in ("text", "images", "data"))
+    reader = PdfReader(out)
+    return (deleted["deleted"] == 1 and saved["size"] > 0 and len(reader.pages) == 3
+            and reader.pages[1].rotation == 90 and text.index("Job 3") < text.index("Job 1")
+            and operations == ["open", "rotate", "delete", "reorder", "add-page-numbers", "extract-text", "save"]
+            and not payload_kept and job.history[5]["characters"] == len(text))
+
+def test_profile(tempdir):
+    pdf1 = os.path.join(tempdir, "profile1.pdf")
+    pdf2 = os.path.join(tempdir, "profile2.pdf")
+    create_sample_pdf(pdf1, 2)
+    create_sample_pdf(pdf2, 2)
+    report_file = os.path.join(tempdir, "profile.json")
+    pydfpro_main(["--profile", report_file, "merge", pdf1, pdf2, "-o", os.path.join(tempdir, "profile_merged.pdf")])
+    with open(report_file, encoding="utf-8") as f:
+        report = json.load(f)
+    # The same phases are available to library callers
+    with profiling("job") as profiler:
+        with PdfJob(pdf1) as job:
+            job.rotate(90)
+            job.save(os.path.join(tempdir, "profile_job.pdf"))
+    job_phases = profiler.report()["phases"]
+    return (report["command"] == "merge" and {"process", "save"} <= set(report["phases"])
+            and report["wall_s"] >= report["phases"]["save"]["wall_s"]
+            and all("max_rss_so_far_mb" in phase for phase in report["phases"].values())
+            and {"open", "process", "save"} <= set(job_phases) and job_phases["process"]["calls"] == 1)
+
+def test_pipeline(tempdir):
+    pdf = os.path.join(tempdir, "pipeline.pdf")
+    recipe = os.path.join(tempdir, "recipe.json")
+    out = os.path.join(tempdir, "pipeline_out.pdf")
+    create_sample_pdf(pdf, 4)
+    with open(recipe, "w") as f:
+        f.write('{"steps": [{"op": "rotate", "angle": 180, "pages": "1"}, {"op": "delete", "pages": "2-3"}]}')
+    class Args: pass
+    Args.input_file = pdf
+    Args.output_file = out
+    Args.recipe = recipe
+    Args.step = ["add-page-numbers format_string={page_num}", "compress level=strong"]
+    handle_pipeline(Args)
+    reader = PdfReader(out)
+    # Inline values take each option's type: watermark text stays a string, numeric options are converted
+    parsed = _parse_inline_step("add-watermark text=123 opacity=0.3 font_size=20 pages=1")
+    return (len(reader.pages) == 2 and reader.pages[0].rotation == 180
+            and parsed == {"op": "add-watermark", "text": "123", "opacity": 0.3, "font_size": 20, "pages": "1"})
+
 def main():
     tempdir = tempfile.mkdtemp(prefix="pydfpro_test_")
     results = {}
     try:
         results["merge"] = test_merge(tempdir)
+        results["merge_engines"] = test_merge_engines(tempdir)
+        results["merge_bookmarks"] = test_merge_bookmarks(tempdir)
         results["split"] = test_split(tempdir)
+        results["split_parallel"] = test_split_parallel(tempdir)
         results["reorder"] = test_reorder(tempdir)
         results["delete"] = test_delete(tempdir)
         results["rotate"] = test_rotate(tempdir)
+        results["rotate_incremental"] = test_rotate_incremental(tempdir)
         results["extract_text"] = test_extract_text(tempdir)
+        results["extract_text_separator"] = test_extract_text_separator(tempdir)
+        results["extract_text_parallel"] = test_extract_text_parallel(tempdir)
         results["extract_images"] = test_extract_images(tempdir)
+        results["extract_images_dedupe"] = test_extract_images_dedupe(tempdir)
+        results["extract_images_parallel"] = test_extract_images_parallel(tempdir)
+        results["extract_images_raw"] = test_extract_images_raw(tempdir)
         results["pdf_to_image"] = test_pdf_to_image(tempdir)
+        results["pdf_to_image_parallel"] = test_pdf_to_image_parallel(tempdir)
+        results["pdf_to_image_cache"] = test_pdf_to_image_cache(tempdir)
         results["images_to_pdf"] = test_images_to_pdf(tempdir)
+        results["images_to_pdf_parallel"] = test_images_to_pdf_parallel(tempdir)
+        results["images_to_pdf_jpeg_passthrough"] = test_images_to_pdf_jpeg_passthrough(tempdir)
         results["add_watermark"] = test_add_watermark(tempdir)
+        results["add_watermark_shared_stamp"] = test_add_watermark_shared_stamp(tempdir)
+        results["add_watermark_indirect_contents"] = test_add_watermark_indirect_contents(tempdir)
         results["add_page_numbers"] = test_add_page_numbers(tempdir)
+        results["add_page_numbers_layout"] = test_add_page_numbers_layout(tempdir)
         results["encrypt_decrypt"] = test_encrypt_decrypt(tempdir)
         results["compress"] = test_compress(tempdir)
+        results["compress_images"] = test_compress_images(tempdir)
+        results["compress_fonts"] = test_compress_fonts(tempdir)
+        results["batch"] = test_batch(tempdir)
+        results["serve"] = test_serve(tempdir)
+        results["object_streams"] = test_object_streams(tempdir)
+        results["linearize"] = test_linearize(tempdir)
+        results["mmap_input"] = test_mmap_input(tempdir)
+        results["pdf_job"] = test_pdf_job(tempdir)
+        results["pipeline"] = test_pipeline(tempdir)
+        results["profile"] = test_profile(tempdir)
     finally:
         shutil.rmtree(tempdir)
     print("\nPyDF Pro Feature Test Results:")